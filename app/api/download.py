@@ -1,13 +1,76 @@
 from fastapi import APIRouter, HTTPException, Request, status
-from fastapi.responses import FileResponse
-from typing import Optional
+from fastapi.responses import FileResponse, Response
+from typing import Final, Optional
 import os
+import re
+import stat
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import quote
+from cachetools import TTLCache
 from ..core.logging import logger
 from ..core.config import settings
+from ..core.image_index import image_index
 
 router = APIRouter()
 
+# 文件扩展名到媒体类型的映射
+_MIME_BY_EXT: Final = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".svg": "image/svg+xml",
+    ".bmp": "image/bmp",
+}
+
+# 合法的文件名：仅允许字母、数字、下划线、点和连字符，且不能以点开头
+# 拒绝路径分隔符、".."以及glob通配符，避免目录穿越和大范围递归查找
+_SAFE_NAME = re.compile(r"(?!\.)[\w.\-]{1,128}")
+
+# 未找到的文件名缓存，避免重复的404请求反复遍历数据目录
+_missing_files: TTLCache = TTLCache(maxsize=4096, ttl=30)
+
+
+def _is_file(path: str) -> bool:
+    """使用单次stat调用判断路径是否为普通文件"""
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def _resolve(file_name: str) -> Path:
+    """
+    解析文件名对应的本地路径
+    
+    依次检查images目录及各提供商子目录，最后才在整个数据目录中递归查找。
+    找不到时抛出FileNotFoundError，异常结果不会被lru_cache缓存。
+    
+    Args:
+        file_name: 文件名
+        
+    Returns:
+        Path: 文件路径
+    """
+    images_dir = os.path.join(settings.DATA_DIR, "images")
+    
+    for candidate in (
+        os.path.join(images_dir, file_name),
+        os.path.join(images_dir, "aliyun", file_name),
+        os.path.join(images_dir, "liblibai", file_name),
+    ):
+        if _is_file(candidate):
+            return Path(candidate)
+    
+    # 如果仍然找不到，在整个数据目录中递归查找
+    for matching_file in Path(settings.DATA_DIR).glob(f"**/{file_name}"):
+        return matching_file
+    
+    raise FileNotFoundError(file_name)
+
 @router.get("/{file_name}")
 async def download_file(
     file_name: str,
@@ -21,57 +84,68 @@ async def download_file(
         request: 请求对象
     
     Returns:
-        FileResponse: 文件响应
+        Response: 文件响应，启用USE_X_ACCEL时为仅包含X-Accel-Redirect头的空响应
     """
     try:
-        # 在数据目录中查找文件
-        data_dir = Path(settings.DATA_DIR)
+        # 在访问文件系统之前校验文件名
+        if not _SAFE_NAME.fullmatch(file_name):
+            logger.warning(f"非法的文件名: {file_name}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file name: {file_name}"
+            )
+        
+        # 优先从图片索引中查找，索引中的文件已被删除时回退到目录查找
+        # 索引在未命中缓存之前检查，Worker刚写入的图片可以立即下载
+        file_path = image_index.lookup(file_name)
+        if file_path is not None and not _is_file(str(file_path)):
+            file_path = None
+        
+        # 短时间内已确认不存在的文件直接返回404
+        if file_path is None and file_name in _missing_files:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"File not found: {file_name}"
+            )
         
-        # 首先检查是否直接存在于images目录下
-        images_dir = data_dir / "images"
-        file_path = images_dir / file_name
+        try:
+            if file_path is None:
+                # 目录查找的结果由_resolve在进程内缓存，不写回索引，避免在事件循环中执行同步的SQLite写入
+                file_path = _resolve(file_name)
+                if not _is_file(str(file_path)):
+                    # 缓存的路径已失效（文件被移动或删除），清空缓存后重新查找
+                    _resolve.cache_clear()
+                    file_path = _resolve(file_name)
+        except FileNotFoundError:
+            _missing_files[file_name] = True
+            logger.error(f"文件未找到: {file_name}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"File not found: {file_name}"
+            )
         
-        if not file_path.exists():
-            # 如果不存在，检查子目录
-            for provider_dir in ["aliyun", "liblibai"]:
-                provider_path = images_dir / provider_dir / file_name
-                if provider_path.exists():
-                    file_path = provider_path
-                    break
-            
-            # 如果仍然找不到，在整个数据目录中递归查找
-            if not file_path.exists():
-                matching_files = list(data_dir.glob(f"**/{file_name}"))
-                
-                if not matching_files:
-                    logger.error(f"文件未找到: {file_name}")
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"File not found: {file_name}"
-                    )
-                
-                file_path = matching_files[0]
-            
         logger.info(f"提供文件下载: {file_path}")
         
         # 根据文件类型设置适当的媒体类型
-        media_type = "image/jpeg"  # 默认类型
-        file_extension = file_path.suffix.lower()
+        media_type = _MIME_BY_EXT.get(file_path.suffix.lower(), "application/octet-stream")
         
-        if file_extension == ".png":
-            media_type = "image/png"
-        elif file_extension in [".jpg", ".jpeg"]:
-            media_type = "image/jpeg"
-        elif file_extension == ".gif":
-            media_type = "image/gif"
-        elif file_extension == ".webp":
-            media_type = "image/webp"
-        elif file_extension == ".svg":
-            media_type = "image/svg+xml"
-        elif file_extension == ".bmp":
-            media_type = "image/bmp"
-        else:
-            media_type = "application/octet-stream"
+        # 由nginx直接发送文件，避免在Python进程中拷贝文件内容
+        if settings.USE_X_ACCEL:
+            # 响应头只能包含latin-1字符，非ASCII的路径和文件名需要先进行百分号编码
+            relative_path = quote(file_path.relative_to(settings.DATA_DIR).as_posix())
+            quoted_name = quote(file_name)
+            if quoted_name != file_name:
+                content_disposition = f"attachment; filename*=utf-8''{quoted_name}"
+            else:
+                content_disposition = f'attachment; filename="{file_name}"'
+            return Response(
+                status_code=status.HTTP_200_OK,
+                headers={
+                    "X-Accel-Redirect": f"{settings.X_ACCEL_INTERNAL_PREFIX}/{relative_path}",
+                    "Content-Type": media_type,
+                    "Content-Disposition": content_disposition
+                }
+            )
         
         # 返回文件
         return FileResponse(
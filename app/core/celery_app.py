@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_init
 from .config import settings
 
 # 创建Celery实例
@@ -38,4 +39,11 @@ celery_app.conf.update(
 )
 
 # 自动发现任务
-celery_app.autodiscover_tasks(["app.worker"]) 
\ No newline at end of file
+celery_app.autodiscover_tasks(["app.worker"]) 
+
+
+@worker_init.connect
+def setup_model_providers(**kwargs):
+    """Worker启动时注册模型提供商"""
+    from ..services.model_providers import register_all
+    register_all()
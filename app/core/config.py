@@ -4,12 +4,20 @@
 """
 
 import os
-from typing import Annotated, Dict, List
+from functools import cache
+from pathlib import Path
+from typing import Annotated, Dict, Tuple
 from urllib.parse import quote_plus
 from pydantic import Field, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+@cache
+def _parse_supported(models: str) -> Tuple[str, ...]:
+    """将逗号分隔的模型列表字符串解析为元组，结果按字符串缓存"""
+    return tuple(model.strip() for model in models.split(","))
+
+
 class Settings(BaseSettings):
     """应用配置类，使用Pydantic V2语法"""
     
@@ -56,6 +64,13 @@ class Settings(BaseSettings):
     # 数据目录
     DATA_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data"))
     
+    # 图片文件名索引数据库（不放在DATA_DIR中，避免通过静态文件路由被访问）
+    IMAGE_INDEX_DB: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../file_index.db"))
+    
+    # 文件下载交由前端nginx通过X-Accel-Redirect发送（需配置对应的internal location）
+    USE_X_ACCEL: bool = False
+    X_ACCEL_INTERNAL_PREFIX: str = "/internal-images"
+    
     # 提供商支持的模型列表（可在.env中配置）
     ALIYUN_SUPPORTED_MODELS: str = "wanx2.1-t2i-turbo,wanx2.1-t2i-plus,wanx2.0-t2i-turbo"
     LIBLIBAI_SUPPORTED_MODELS: str = "star-3-alpha-t2i,star-3-alpha-i2i,liblib-custom"
@@ -119,11 +134,11 @@ class Settings(BaseSettings):
             
     @computed_field
     @property
-    def PROVIDER_SUPPORTED_MODELS(self) -> Dict[str, List[str]]:
-        """获取各提供商支持的模型列表，将逗号分隔的字符串转换为列表"""
+    def PROVIDER_SUPPORTED_MODELS(self) -> Dict[str, Tuple[str, ...]]:
+        """获取各提供商支持的模型列表，将逗号分隔的字符串转换为元组"""
         return {
-            "aliyun": [model.strip() for model in self.ALIYUN_SUPPORTED_MODELS.split(",")],
-            "liblibai": [model.strip() for model in self.LIBLIBAI_SUPPORTED_MODELS.split(",")]
+            "aliyun": _parse_supported(self.ALIYUN_SUPPORTED_MODELS),
+            "liblibai": _parse_supported(self.LIBLIBAI_SUPPORTED_MODELS)
         }
     
     def __init__(self, **data):
@@ -135,6 +150,13 @@ class Settings(BaseSettings):
             # 使用 MongoDB 作为结果后端
             # 正确的格式：mongodb://[username:password@]host:port
             self.CELERY_RESULT_BACKEND = f"mongodb://{self.MONGODB_CONNECTION_STRING.replace('mongodb://', '')}"
+        # 预先创建各提供商的图片保存目录，下载图片时无需再检查目录是否存在
+        for provider in ("aliyun", "liblibai"):
+            try:
+                Path(self.DATA_DIR, "images", provider).mkdir(parents=True, exist_ok=True)
+            except OSError:
+                # 目录无法创建时不影响配置加载，下载图片时会记录错误
+                pass
 
 
 # 创建全局设置对象
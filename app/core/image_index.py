@@ -0,0 +1,139 @@
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional, Union
+from .config import settings
+from .logging import logger
+
+
+class ImageIndex:
+    """
+    本地图片索引，维护文件名到文件路径的映射，避免下载时逐个目录探测文件
+
+    索引持久化在SQLite数据库中，Celery Worker写入的图片对API进程立即可见；
+    内存中的字典仅作为查询结果的缓存
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._paths: Dict[str, Path] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取数据库连接，fork后的子进程会重新建立连接"""
+        pid = os.getpid()
+        if self._conn is None or self._conn_pid != pid:
+            try:
+                os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+            except OSError:
+                # 目录无法创建时由sqlite3.connect报告具体错误
+                pass
+            conn = sqlite3.connect(self._db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS files(name TEXT PRIMARY KEY, path TEXT NOT NULL)")
+            self._conn = conn
+            self._conn_pid = pid
+            self._paths = {}
+        return self._conn
+
+    def scan(self, data_dir: Union[str, Path]) -> int:
+        """
+        索引为空时递归扫描数据目录，将已有文件写入索引
+
+        Args:
+            data_dir: 数据目录
+
+        Returns:
+            int: 索引中的文件数量，索引不可用时返回0
+        """
+        try:
+            conn = self._connection()
+            indexed_count = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        except sqlite3.Error as e:
+            # 索引不可用时不影响服务启动，下载时会回退到目录查找
+            logger.warning(f"打开图片索引失败: {self._db_path}, 错误: {str(e)}")
+            return 0
+        if indexed_count:
+            return indexed_count
+
+        paths: Dict[str, str] = {}
+        pending = [str(data_dir)]
+
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            # 同名文件只保留先扫描到的路径
+                            paths.setdefault(entry.name, entry.path)
+            except OSError as e:
+                logger.warning(f"扫描目录失败: {directory}, 错误: {str(e)}")
+
+        # 连接处于自动提交模式，需显式开启事务，避免每行单独提交
+        try:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT OR IGNORE INTO files(name, path) VALUES (?, ?)", paths.items())
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(f"写入图片索引失败: {self._db_path}, 错误: {str(e)}")
+            return 0
+        return len(paths)
+
+    def add(self, path: Union[str, Path]) -> None:
+        """
+        将文件添加到索引
+
+        Args:
+            path: 文件路径
+        """
+        if not path:
+            return
+        path = Path(path)
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO files(name, path) VALUES (?, ?)",
+                (path.name, str(path))
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"写入图片索引失败: {path}, 错误: {str(e)}")
+            return
+        self._paths[path.name] = path
+
+    def lookup(self, name: str) -> Optional[Path]:
+        """
+        根据文件名查找文件路径
+
+        Args:
+            name: 文件名
+
+        Returns:
+            Optional[Path]: 文件路径，不存在时返回None
+        """
+        path = self._paths.get(name)
+        if path is not None:
+            return path
+
+        try:
+            row = self._connection().execute("SELECT path FROM files WHERE name = ?", (name,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"查询图片索引失败: {name}, 错误: {str(e)}")
+            return None
+        if row is None:
+            return None
+
+        path = Path(row[0])
+        self._paths[name] = path
+        return path
+
+
+# 创建全局图片索引
+image_index = ImageIndex(settings.IMAGE_INDEX_DB)
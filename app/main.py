@@ -13,6 +13,8 @@ from .core.logging import logger
 from .db.mongodb import init_mongodb
 from .middleware.auth import AuthMiddleware, PermissionMiddleware
 from .core.permissions import setup_permissions
+from .core.image_index import image_index
+from .services.model_providers import register_all, close_provider_clients
 from .utils.helpers import FileUtils
 
 # 配置日志
@@ -32,6 +34,10 @@ async def lifespan(app: FastAPI):
     logger.info(f"任务创建路由: http://service.scitiger.cn/image-service{settings.API_V1_STR}/tasks/")
     logger.info(f"静态媒体文件路径: http://127.0.0.1:8085/media/")
     
+    # 注册模型提供商
+    register_all()
+    logger.info("模型提供商注册完成")
+    
     # 初始化MongoDB
     await init_mongodb()
     logger.info("MongoDB连接初始化完成")
@@ -40,6 +46,10 @@ async def lifespan(app: FastAPI):
     await FileUtils.setup()
     logger.info("文件工具类初始化完成")
     
+    # 建立本地图片索引
+    indexed_count = image_index.scan(settings.DATA_DIR)
+    logger.info(f"本地图片索引建立完成，共{indexed_count}个文件")
+    
     # 初始化权限映射表
     setup_permissions(app)
     logger.info("权限映射表初始化完成")
@@ -48,6 +58,9 @@ async def lifespan(app: FastAPI):
     
     # 关闭事件
     logger.info(f"Shutting down {settings.APP_NAME}")
+    
+    # 关闭模型提供商共享的HTTP客户端
+    await close_provider_clients()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -22,6 +22,17 @@ def register_provider(provider_class: Type[ModelProvider]) -> Type[ModelProvider
     return provider_class
 
 
+def register_all() -> None:
+    """
+    注册所有模型提供商，在应用和Celery Worker启动时调用一次
+    """
+    from .aliyun import AliyunProvider  # 阿里云提供商
+    from .liblibai import LiblibAIProvider  # LiblibAI提供商
+    
+    for provider_class in (AliyunProvider, LiblibAIProvider):
+        register_provider(provider_class)
+
+
 def get_provider(provider_name: str = None) -> ModelProvider:
     """
     获取模型提供商实例
@@ -57,6 +68,11 @@ def get_all_providers() -> Dict[str, ModelProvider]:
     """
     return {name: provider_class() for name, provider_class in _providers.items()}
 
-# 导入所有提供商模块以触发注册
-from . import aliyun  # 阿里云提供商
-from . import liblibai  # LiblibAI提供商
\ No newline at end of file
+async def close_provider_clients() -> None:
+    """
+    关闭所有模型提供商共享的HTTP客户端
+    """
+    for provider_class in _providers.values():
+        close_client = getattr(provider_class, "close_client", None)
+        if close_client is not None:
+            await close_client()
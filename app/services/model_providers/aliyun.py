@@ -1,17 +1,21 @@
 import httpx
-import json
+import orjson
 import time
 import os
+import random
+import secrets
 import asyncio
-from pathlib import Path
 from datetime import datetime
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any
 
-from .base import ModelProvider
+from .base import ModelProvider, LazyJSON
 from ...core.logging import logger
 from ...core.config import settings
 
+# 不属于请求parameters部分的参数，其余参数名与API参数名一致，直接透传
+_EXCLUDED_PARAMS = frozenset({"model", "prompt", "negative_prompt", "ref_img"})
+
 
 class AliyunProvider(ModelProvider):
     """阿里云模型提供商"""
@@ -21,13 +25,6 @@ class AliyunProvider(ModelProvider):
         """提供商名称"""
         return "aliyun"
     
-    @property
-    def supported_models(self) -> List[str]:
-        """从配置文件中获取支持的模型列表"""
-        return settings.PROVIDER_SUPPORTED_MODELS.get("aliyun", [
-            "wanx2.1-t2i-turbo", "wanx2.1-t2i-plus", "wanx2.0-t2i-turbo"
-        ])
-    
     async def validate_parameters(self, model: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """
         验证模型参数
@@ -40,7 +37,7 @@ class AliyunProvider(ModelProvider):
             Dict[str, Any]: 验证后的参数
         """
         # 检查模型是否支持
-        if model not in self.supported_models:
+        if not self.is_supported_model(model):
             supported = ", ".join(self.supported_models)
             raise ValueError(f"Model '{model}' not supported. Supported models: {supported}")
         
@@ -91,36 +88,15 @@ class AliyunProvider(ModelProvider):
             
         return validated
     
-    async def download_image(self, url: str, save_path: str) -> str:
-        """
-        下载图像并保存到本地
-        
-        Args:
-            url: 图像URL
-            save_path: 保存路径
-            
-        Returns:
-            str: 本地文件路径
-        """
-        try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            
-            # 下载图像
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                # 保存图像
-                with open(save_path, "wb") as f:
-                    f.write(response.content)
-                    
-                logger.info(f"Image downloaded and saved to {save_path}")
-                return save_path
-        except Exception as e:
-            logger.error(f"Error downloading image: {str(e)}")
-            return ""
-      
+    @classmethod
+    def _client_kwargs(cls) -> Dict[str, Any]:
+        """共享HTTP客户端的创建参数"""
+        return {
+            "timeout": 120.0,
+            "limits": httpx.Limits(max_keepalive_connections=64, keepalive_expiry=60),
+            "http2": True,
+        }
+    
     async def call_model(self, model: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """
         调用阿里云图像模型
@@ -154,8 +130,7 @@ class AliyunProvider(ModelProvider):
                 "model": validated_params["model"],
                 "input": {
                     "prompt": validated_params["prompt"]
-                },
-                "parameters": {}
+                }
             }
             
             # 添加负面提示词
@@ -167,30 +142,12 @@ class AliyunProvider(ModelProvider):
                 request_data["input"]["ref_image"] = validated_params["ref_img"]
             
             # 将所有除了特定排除参数之外的参数添加到请求的parameters中
-            exclude_keys = ["model", "prompt", "negative_prompt", "ref_img"]  # 这些参数不属于parameters部分
-            
-            # 特别处理某些参数
-            special_params = {
-                "size": "size",
-                "n": "n",
-                "style": "style",
-                "seed": "seed",
-                "ref_strength": "ref_strength",
-                "ref_mode": "ref_mode"
+            request_data["parameters"] = {
+                key: value for key, value in validated_params.items() if key not in _EXCLUDED_PARAMS
             }
             
-            # 添加特殊参数到parameters中
-            for param_name, api_param in special_params.items():
-                if param_name in validated_params:
-                    request_data["parameters"][api_param] = validated_params[param_name]
-                    
-            # 添加其他自定义参数
-            for key, value in validated_params.items():
-                if key not in exclude_keys and key not in special_params:
-                    request_data["parameters"][key] = value
-                    
             # 记录完整的请求参数
-            logger.info(f"Request data for Aliyun API: {json.dumps(request_data, ensure_ascii=False)}")
+            logger.info("Request data for Aliyun API: %s", LazyJSON(request_data))
             
             # 准备请求头，添加异步调用标识
             headers = {
@@ -201,72 +158,79 @@ class AliyunProvider(ModelProvider):
             }
             
             # 调用API创建任务
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(
-                    api_url,
-                    json=request_data,
-                    headers=headers
-                )
-                
-                # 检查响应状态
-                response.raise_for_status()
-                task_result = response.json()
-                
-                # 记录完整的响应
-                logger.info(f"Task creation response: {json.dumps(task_result, ensure_ascii=False)}")
+            client = await self.client()
+            response = await client.post(
+                api_url,
+                content=orjson.dumps(request_data),
+                headers=headers
+            )
+            
+            # 检查响应状态
+            response.raise_for_status()
+            task_result = orjson.loads(response.content)
+            
+            # 记录完整的响应
+            logger.info("Task creation response: %s", LazyJSON(task_result))
+            
+            # 获取任务ID - 从output字段中获取
+            output = task_result.get("output", {})
+            task_id = output.get("task_id")
+            if not task_id:
+                # 记录完整的响应以便调试
+                logger.error(f"Failed to get task_id from response: {task_result}")
+                raise ValueError(f"Failed to get task_id from response: {task_result}")
+            
+            logger.info(f"Created Aliyun async task with ID: {task_id}")
+            
+            # 查询任务状态的URL和请求头在轮询期间保持不变
+            # DashScope任务查询接口不支持长轮询参数，只能按间隔轮询
+            task_status_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
+            status_headers = {"Authorization": f"Bearer {api_key}"}
+            
+            # 轮询任务结果 - 从较短的间隔开始指数退避，快速任务可以尽早返回
+            # 总等待时间与原先120次×15秒一致，需明显短于Celery的task_time_limit，
+            # 否则任务会在超时处理前被强制终止，任务状态无法更新
+            deadline = time.monotonic() + 120 * 15
+            delay = 1.5  # 初始等待时间（秒）
+            
+            while time.monotonic() < deadline:
+                # 等待一段时间（加入少量随机抖动，避免并发任务同时轮询）
+                await asyncio.sleep(delay + random.uniform(0, 0.25 * delay))
+                delay = min(30.0, delay * 1.5)
                 
-                # 获取任务ID - 从output字段中获取
-                output = task_result.get("output", {})
-                task_id = output.get("task_id")
-                if not task_id:
-                    # 记录完整的响应以便调试
-                    logger.error(f"Failed to get task_id from response: {task_result}")
-                    raise ValueError(f"Failed to get task_id from response: {task_result}")
+                # 查询任务状态
+                status_response = await client.get(
+                    task_status_url,
+                    headers=status_headers
+                )
                 
-                logger.info(f"Created Aliyun async task with ID: {task_id}")
+                status_response.raise_for_status()
+                task_status = orjson.loads(status_response.content)
                 
-                # 轮询任务结果 - 增加轮询次数和间隔时间
-                max_retries = 120  # 最多等待120次 (增加到2分钟)
-                retry_interval = 15  # 每次等待15秒 (增加间隔)
+                # 记录完整的任务状态响应
+                logger.debug("Task %s status response: %s", task_id, LazyJSON(task_status))
                 
-                for i in range(max_retries):
-                    # 等待一段时间
-                    await asyncio.sleep(retry_interval)
-                    
-                    # 查询任务状态
-                    task_status_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
-                    status_response = await client.get(
-                        task_status_url,
-                        headers={"Authorization": f"Bearer {api_key}"}
-                    )
-                    
-                    status_response.raise_for_status()
-                    task_status = status_response.json()
-                    
-                    # 记录完整的任务状态响应
-                    logger.info(f"Task {task_id} status response: {json.dumps(task_status, ensure_ascii=False)}")
-                    
-                    # 检查任务状态 - 尝试从不同位置获取状态
-                    task_status_value = task_status.get("task_status", "")
-                    if not task_status_value and "output" in task_status:
-                        task_status_value = task_status["output"].get("task_status", "")
-                    
-                    logger.info(f"Task {task_id} status: {task_status_value}")
-                    
-                    # 如果任务完成或失败，返回结果
-                    if task_status_value in ["SUCCEEDED", "COMPLETE", "SUCCESS"]:
-                        # 格式化响应结果并下载图片
-                        result = await self._format_response_and_download_images(task_status, validated_params)
-                        return result
-                    elif task_status_value in ["FAILED", "CANCELLED", "ERROR"]:
-                        error_msg = task_status.get("message", "Unknown error")
-                        if "output" in task_status and "message" in task_status["output"]:
-                            error_msg = task_status["output"]["message"]
-                        raise ValueError(f"Task failed: {error_msg}")
+                # 检查任务状态 - 尝试从不同位置获取状态
+                task_status_value = task_status.get("task_status", "")
+                if not task_status_value and "output" in task_status:
+                    task_status_value = task_status["output"].get("task_status", "")
                 
-                # 超过最大重试次数
-                raise ValueError(f"Task {task_id} did not complete within expected time")
+                logger.debug("Task %s status: %s", task_id, task_status_value)
                 
+                # 如果任务完成或失败，返回结果
+                if task_status_value in ["SUCCEEDED", "COMPLETE", "SUCCESS"]:
+                    # 格式化响应结果并下载图片
+                    result = await self._format_response_and_download_images(task_status, validated_params)
+                    return result
+                elif task_status_value in ["FAILED", "CANCELLED", "ERROR"]:
+                    error_msg = task_status.get("message", "Unknown error")
+                    if "output" in task_status and "message" in task_status["output"]:
+                        error_msg = task_status["output"]["message"]
+                    raise ValueError(f"Task failed: {error_msg}")
+            
+            # 超过最大重试次数
+            raise ValueError(f"Task {task_id} did not complete within expected time")
+            
         except httpx.HTTPStatusError as e:
             error_detail = {}
             try:
@@ -316,24 +280,24 @@ class AliyunProvider(ModelProvider):
             if "result" in api_response:
                 results = api_response["result"].get("results", [])
         
-        # 设置图片保存目录
-        images_dir = Path(settings.DATA_DIR) / "images" / "aliyun"
-        os.makedirs(images_dir, exist_ok=True)
-        
-        # 下载并保存图片
+        # 生成每张图片的保存路径
+        download_tasks = []
         for i, result in enumerate(results):
             image_url = result.get("url", "")
             if not image_url:
                 continue
                 
             # 生成唯一文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_name = f"{timestamp}_{i}_{uuid.uuid4().hex[:8]}.png"
-            local_path = os.path.join(images_dir, file_name)
-            
-            # 下载图片
-            saved_path = await self.download_image(image_url, local_path)
-            
+            file_name = f"{time.time_ns()}_{i}_{secrets.token_hex(4)}.png"
+            local_path = os.path.join(self.images_dir, file_name)
+            download_tasks.append((i, result, image_url, local_path))
+        
+        # 并发下载所有图片
+        saved_paths = await self.download_images(
+            [(image_url, local_path) for _, _, image_url, local_path in download_tasks]
+        )
+        
+        for (i, result, image_url, _), saved_path in zip(download_tasks, saved_paths):
             # 添加到响应中
             image_data = {
                 "index": i,
@@ -364,11 +328,3 @@ class AliyunProvider(ModelProvider):
             formatted_response["height"] = 1024
             
         return formatted_response
-
-
-# 导入asyncio
-import asyncio
-
-# 注册提供商
-from . import register_provider
-register_provider(AliyunProvider) 
\ No newline at end of file
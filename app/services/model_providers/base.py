@@ -1,10 +1,70 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from functools import cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import os
+import aiofiles
+import httpx
+import orjson
+from ...core.config import settings
+from ...core.logging import logger
+from ...core.image_index import image_index
+
+# 下载图片时每次写入的块大小
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class LazyJSON:
+    """延迟序列化的日志参数，只有日志实际输出时才执行JSON序列化"""
+    
+    __slots__ = ("obj",)
+    
+    def __init__(self, obj: Any):
+        self.obj = obj
+    
+    def __str__(self) -> str:
+        return orjson.dumps(self.obj).decode()
+
+
+def _drop_page_cache(fd: int) -> None:
+    """
+    将已写入的数据落盘后提示内核丢弃对应的页缓存
+
+    内核只会丢弃干净的页面，因此需要先fdatasync；两者都是阻塞调用，应在线程中执行
+
+    Args:
+        fd: 文件描述符
+    """
+    os.fdatasync(fd)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+@cache
+def _supported_models(provider_name: str) -> Tuple[str, ...]:
+    """按提供商名称缓存配置中支持的模型列表（提供商实例每次调用都会重新创建，无法在实例上缓存）"""
+    return settings.PROVIDER_SUPPORTED_MODELS.get(provider_name, ())
+
+
+@cache
+def _supported_model_set(provider_name: str) -> frozenset:
+    """按提供商名称缓存支持的模型集合，用于快速判断模型是否支持"""
+    return frozenset(_supported_models(provider_name))
+
+
+@cache
+def _images_dir(provider_name: str) -> Path:
+    """按提供商名称缓存图片保存目录，目录由Settings初始化时创建"""
+    return Path(settings.DATA_DIR) / "images" / provider_name
 
 
 class ModelProvider(ABC):
     """模型提供商基类"""
     
+    # 创建任务、轮询状态和下载图片共享的HTTP客户端，保持连接复用，每个提供商子类各有一个
+    _client: Optional[httpx.AsyncClient] = None
+    _client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
     @property
     @abstractmethod
     def provider_name(self) -> str:
@@ -12,10 +72,18 @@ class ModelProvider(ABC):
         pass
     
     @property
-    @abstractmethod
     def supported_models(self) -> List[str]:
-        """支持的模型列表"""
-        pass
+        """从配置文件中获取支持的模型列表"""
+        return list(_supported_models(self.provider_name))
+    
+    def is_supported_model(self, model: str) -> bool:
+        """判断是否支持指定模型"""
+        return model in _supported_model_set(self.provider_name)
+    
+    @property
+    def images_dir(self) -> Path:
+        """图片保存目录"""
+        return _images_dir(self.provider_name)
     
     @abstractmethod
     async def call_model(self, model: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -43,4 +111,104 @@ class ModelProvider(ABC):
         Returns:
             Dict[str, Any]: 验证后的参数
         """
-        pass 
\ No newline at end of file
+        pass
+    
+    @classmethod
+    def _client_kwargs(cls) -> Dict[str, Any]:
+        """共享HTTP客户端的创建参数，子类可按上游服务的特点覆盖"""
+        return {"timeout": 120.0, "http2": True}
+    
+    @classmethod
+    async def client(cls) -> httpx.AsyncClient:
+        """
+        获取共享的HTTP客户端
+        
+        Celery任务每次都会创建新的事件循环，客户端的连接池绑定在创建它的事件循环上，
+        因此事件循环变化时需要重新创建客户端
+        
+        Returns:
+            httpx.AsyncClient: HTTP客户端
+        """
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client.is_closed or cls._client_loop is not loop:
+            cls._client = httpx.AsyncClient(**cls._client_kwargs())
+            cls._client_loop = loop
+        return cls._client
+    
+    @classmethod
+    async def close_client(cls) -> None:
+        """关闭共享的HTTP客户端"""
+        client, client_loop = cls._client, cls._client_loop
+        cls._client = None
+        cls._client_loop = None
+        if client is not None and not client.is_closed and client_loop is asyncio.get_running_loop():
+            await client.aclose()
+    
+    async def download_image(self, url: str, save_path: str) -> str:
+        """
+        下载图像并保存到本地
+        
+        Args:
+            url: 图像URL
+            save_path: 保存路径
+            
+        Returns:
+            str: 本地文件路径，下载失败时返回空字符串
+        """
+        try:
+            # 流式下载图像并分块写入文件，避免将整张图片读入内存和阻塞事件循环
+            # 先写入临时文件，下载完成后再原子重命名，避免进程中断时留下不完整的图片
+            tmp_path = save_path + ".tmp"
+            client = await self.client()
+            try:
+                async with client.stream("GET", url, timeout=30.0) as response:
+                    response.raise_for_status()
+                    
+                    async with aiofiles.open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                            await f.write(chunk)
+                        
+                        # 提示内核不再缓存已写入的页面，减轻Worker主机的页缓存压力
+                        if hasattr(os, "posix_fadvise"):
+                            await f.flush()
+                            await asyncio.to_thread(_drop_page_cache, f.fileno())
+                
+                os.replace(tmp_path, save_path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            
+            logger.info(f"Image downloaded and saved to {save_path}")
+            return save_path
+        except Exception as e:
+            logger.error(f"Error downloading image: {str(e)}")
+            return ""
+    
+    async def download_images(self, downloads: List[Tuple[str, str]]) -> List[str]:
+        """
+        并发下载多张图片，成功保存的图片写入图片索引
+        
+        Args:
+            downloads: (图像URL, 保存路径)列表
+            
+        Returns:
+            List[str]: 与downloads一一对应的本地文件路径，下载失败时为空字符串
+        """
+        results = await asyncio.gather(
+            *(self.download_image(url, save_path) for url, save_path in downloads),
+            return_exceptions=True
+        )
+        
+        saved_paths = []
+        for (url, _), result in zip(downloads, results):
+            # download_image自身会捕获Exception，这里只会收到CancelledError等BaseException
+            if isinstance(result, BaseException):
+                logger.error(f"Error downloading image {url}: {result!r}")
+                result = ""
+            elif result:
+                image_index.add(result)
+            saved_paths.append(result)
+        return saved_paths 
\ No newline at end of file
@@ -1,20 +1,155 @@
 import httpx
-import json
+import orjson
 import time
 import os
 import asyncio
 import hmac
 from hashlib import sha1
 import base64
+import secrets
 import uuid
-from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any
 
-from .base import ModelProvider
+from .base import ModelProvider, LazyJSON
 from ...core.logging import logger
 from ...core.config import settings
 
+# 标准base64到URL安全base64的字符转换表
+_B64_TRANS = bytes.maketrans(b"+/", b"-_")
+
+
+class _RedactedStatus(LazyJSON):
+    """任务状态日志参数，输出时将图片列表替换为数量摘要，避免序列化和写入大量图片信息"""
+    
+    __slots__ = ()
+    
+    def __str__(self) -> str:
+        data = self.obj.get("data") or {}
+        images = data.get("images")
+        if not images:
+            return super().__str__()
+        return orjson.dumps({**self.obj, "data": {**data, "images": f"<{len(images)} images>"}}).decode()
+
+
+# 各模型创建任务的API端点
+_ENDPOINTS = {
+    "star-3-alpha-t2i": "/api/generate/webui/text2img/ultra",
+    "star-3-alpha-i2i": "/api/generate/webui/img2img/ultra",
+}
+
+# 自定义模型的API端点，按是否为图生图（generateParams中包含sourceImage）选择
+_CUSTOM_ENDPOINTS = {
+    False: "/api/generate/webui/text2img",
+    True: "/api/generate/webui/img2img",
+}
+
+# 自定义模型的模板UUID，键为(是否F.1基础算法, 是否图生图)
+_CUSTOM_TEMPLATES = {
+    (True, True): "63b72710c9574457ba303d9d9b8df8bd",  # F.1图生图模板
+    (False, True): "9c7d531dc75f476aa833b3d452b8f7ad",  # 1.5和XL图生图模板
+    (True, False): "6f7c4652458d4802969f8d089cf5b91f",  # F.1文生图模板
+    (False, False): "e10adc3949ba59abbe56e057f20f883e",  # 1.5和XL文生图模板
+}
+
+# 查询任务状态的API端点
+_STATUS_ENDPOINT = "/api/generate/webui/status"
+
+# API基础URL在加载配置后不再变化，预先构建完整URL，避免每次请求重新拼接和解析
+_API_BASE_URL = settings.LIBLIBAI_API_URL or "https://openapi.liblibai.cloud"
+_API_URLS = {
+    endpoint: httpx.URL(f"{_API_BASE_URL}{endpoint}")
+    for endpoint in (*_ENDPOINTS.values(), *_CUSTOM_ENDPOINTS.values(), _STATUS_ENDPOINT)
+}
+
+
+@lru_cache(maxsize=4)
+def _hmac_template(secret_key: str) -> "hmac.HMAC":
+    """按密钥缓存完成密钥预处理的HMAC对象，生成签名时复制后使用"""
+    return hmac.new(secret_key.encode(), None, sha1)
+
+
+def _validate_star3_t2i(validated: Dict[str, Any]) -> None:
+    """验证和处理星流Star-3 Alpha文生图参数"""
+    # 验证必需参数
+    if "prompt" not in validated:
+        raise ValueError("Parameter 'prompt' is required for Star-3 Alpha text-to-image")
+    
+    # 确保generateParams存在，并将prompt添加到generateParams
+    generate_params = validated.setdefault("generateParams", {})
+    generate_params.setdefault("prompt", validated["prompt"])
+    
+    # 设置默认参数
+    if "aspectRatio" not in generate_params and "imageSize" not in generate_params:
+        generate_params["aspectRatio"] = "portrait"
+    generate_params.setdefault("imgCount", 1)
+    
+    # 设置模板UUID
+    validated.setdefault("templateUuid", "5d7e67009b344550bc1aa6ccbfa1d7f4")  # 星流Star-3 Alpha文生图固定模板
+
+
+def _validate_star3_i2i(validated: Dict[str, Any]) -> None:
+    """验证和处理星流Star-3 Alpha图生图参数"""
+    # 验证必需参数
+    if "prompt" not in validated:
+        raise ValueError("Parameter 'prompt' is required for Star-3 Alpha image-to-image")
+    
+    if "sourceImage" not in validated:
+        raise ValueError("Parameter 'sourceImage' is required for Star-3 Alpha image-to-image")
+    
+    # 确保generateParams存在，并将参数添加到generateParams
+    generate_params = validated.setdefault("generateParams", {})
+    generate_params.setdefault("prompt", validated["prompt"])
+    generate_params.setdefault("sourceImage", validated["sourceImage"])
+    
+    # 设置默认参数
+    generate_params.setdefault("width", 768)
+    generate_params.setdefault("height", 1024)
+    generate_params.setdefault("imgCount", 1)
+    
+    # 设置模板UUID
+    validated.setdefault("templateUuid", "07e00af4fc464c7ab55ff906f8acf1b7")  # 星流Star-3 Alpha图生图固定模板
+
+
+def _validate_custom(validated: Dict[str, Any]) -> None:
+    """验证和处理LiblibAI自定义模型参数"""
+    # 验证必需参数
+    if "checkPointId" not in validated:
+        raise ValueError("Parameter 'checkPointId' is required for LiblibAI custom model")
+    
+    if "prompt" not in validated:
+        raise ValueError("Parameter 'prompt' is required for LiblibAI custom model")
+    
+    # 确保generateParams存在，并将参数添加到generateParams
+    generate_params = validated.setdefault("generateParams", {})
+    generate_params.setdefault("checkPointId", validated["checkPointId"])
+    generate_params.setdefault("prompt", validated["prompt"])
+    
+    # 设置默认参数
+    generate_params.setdefault("sampler", 15)  # DPM++ 2M Karras
+    generate_params.setdefault("steps", 20)
+    generate_params.setdefault("cfgScale", 7)
+    generate_params.setdefault("width", 768)
+    generate_params.setdefault("height", 1024)
+    generate_params.setdefault("imgCount", 1)
+    generate_params.setdefault("seed", -1)
+    
+    # 设置模板UUID (根据基础算法类型和是文生图还是图生图选择)
+    if "templateUuid" not in validated:
+        # 检查是否指定了基础算法类型
+        base_model_type = validated.get("baseModelType", "").lower()
+        is_f1 = base_model_type in ("f.1", "f1")
+        is_i2i = "sourceImage" in generate_params
+        validated["templateUuid"] = _CUSTOM_TEMPLATES[(is_f1, is_i2i)]
+
+
+# 各模型的参数验证函数
+_VALIDATORS = {
+    "star-3-alpha-t2i": _validate_star3_t2i,
+    "star-3-alpha-i2i": _validate_star3_i2i,
+    "liblib-custom": _validate_custom,
+}
+
 
 class LiblibAIProvider(ModelProvider):
     """LiblibAI模型提供商"""
@@ -24,13 +159,6 @@ class LiblibAIProvider(ModelProvider):
         """提供商名称"""
         return "liblibai"
     
-    @property
-    def supported_models(self) -> List[str]:
-        """从配置文件中获取支持的模型列表"""
-        return settings.PROVIDER_SUPPORTED_MODELS.get("liblibai", [
-            "star-3-alpha-t2i", "star-3-alpha-i2i", "liblib-custom"
-        ])
-    
     def generate_signature(self, uri: str) -> Dict[str, str]:
         """
         生成LiblibAI API签名
@@ -50,15 +178,18 @@ class LiblibAIProvider(ModelProvider):
         
         # 生成时间戳和随机字符串
         timestamp = str(int(time.time() * 1000))
-        signature_nonce = str(uuid.uuid4())
+        signature_nonce = secrets.token_hex(16)
         
         # 拼接请求数据
         content = '&'.join((uri, timestamp, signature_nonce))
         
         # 生成签名
-        digest = hmac.new(secret_key.encode(), content.encode(), sha1).digest()
+        # 复制预处理过密钥的HMAC对象比hmac.digest()一次性计算更快（后者每次都要重新处理密钥）
+        h = _hmac_template(secret_key).copy()
+        h.update(content.encode("ascii"))
+        digest = h.digest()
         # 移除为了补全base64位数而填充的尾部等号
-        signature = base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+        signature = base64.b64encode(digest).translate(_B64_TRANS).rstrip(b"=").decode("ascii")
         
         return {
             "AccessKey": access_key,
@@ -79,167 +210,30 @@ class LiblibAIProvider(ModelProvider):
             Dict[str, Any]: 验证后的参数
         """
         # 检查模型是否支持
-        if model not in self.supported_models:
+        if not self.is_supported_model(model):
             supported = ", ".join(self.supported_models)
             raise ValueError(f"Model '{model}' not supported. Supported models: {supported}")
         
-        # 首先复制所有原始参数，保留自定义参数
-        validated = parameters.copy()
-        
-        # 添加模型信息
-        validated["model"] = model
+        # 复制所有原始参数（保留自定义参数）并添加模型信息
+        # 调用方在验证后仍会使用原始参数（如提交Celery任务），因此不能直接修改传入的字典
+        validated = {**parameters, "model": model}
         
         # 根据不同模型类型验证和处理参数
-        if model == "star-3-alpha-t2i":
-            # 验证必需参数
-            if "prompt" not in validated:
-                raise ValueError("Parameter 'prompt' is required for Star-3 Alpha text-to-image")
-                
-            # 确保generateParams存在
-            if "generateParams" not in validated:
-                validated["generateParams"] = {}
-                
-            # 将prompt添加到generateParams
-            if "prompt" not in validated["generateParams"]:
-                validated["generateParams"]["prompt"] = validated["prompt"]
-                
-            # 设置默认参数
-            if "aspectRatio" not in validated["generateParams"] and "imageSize" not in validated["generateParams"]:
-                validated["generateParams"]["aspectRatio"] = "portrait"
-                
-            if "imgCount" not in validated["generateParams"]:
-                validated["generateParams"]["imgCount"] = 1
-                
-            # 设置模板UUID
-            if "templateUuid" not in validated:
-                validated["templateUuid"] = "5d7e67009b344550bc1aa6ccbfa1d7f4"  # 星流Star-3 Alpha文生图固定模板
-                
-        elif model == "star-3-alpha-i2i":
-            # 验证必需参数
-            if "prompt" not in validated:
-                raise ValueError("Parameter 'prompt' is required for Star-3 Alpha image-to-image")
-                
-            if "sourceImage" not in validated:
-                raise ValueError("Parameter 'sourceImage' is required for Star-3 Alpha image-to-image")
-                
-            # 确保generateParams存在
-            if "generateParams" not in validated:
-                validated["generateParams"] = {}
-                
-            # 将参数添加到generateParams
-            if "prompt" not in validated["generateParams"]:
-                validated["generateParams"]["prompt"] = validated["prompt"]
-                
-            if "sourceImage" not in validated["generateParams"]:
-                validated["generateParams"]["sourceImage"] = validated["sourceImage"]
-                
-            # 设置默认参数
-            if "width" not in validated["generateParams"]:
-                validated["generateParams"]["width"] = 768
-                
-            if "height" not in validated["generateParams"]:
-                validated["generateParams"]["height"] = 1024
-                
-            if "imgCount" not in validated["generateParams"]:
-                validated["generateParams"]["imgCount"] = 1
-                
-            # 设置模板UUID
-            if "templateUuid" not in validated:
-                validated["templateUuid"] = "07e00af4fc464c7ab55ff906f8acf1b7"  # 星流Star-3 Alpha图生图固定模板
-        
-        elif model == "liblib-custom":
-            # 验证必需参数
-            if "checkPointId" not in validated:
-                raise ValueError("Parameter 'checkPointId' is required for LiblibAI custom model")
-                
-            if "prompt" not in validated:
-                raise ValueError("Parameter 'prompt' is required for LiblibAI custom model")
-                
-            # 确保generateParams存在
-            if "generateParams" not in validated:
-                validated["generateParams"] = {}
-                
-            # 将参数添加到generateParams
-            if "checkPointId" not in validated["generateParams"]:
-                validated["generateParams"]["checkPointId"] = validated["checkPointId"]
-                
-            if "prompt" not in validated["generateParams"]:
-                validated["generateParams"]["prompt"] = validated["prompt"]
-                
-            # 设置默认参数
-            if "sampler" not in validated["generateParams"]:
-                validated["generateParams"]["sampler"] = 15  # DPM++ 2M Karras
-                
-            if "steps" not in validated["generateParams"]:
-                validated["generateParams"]["steps"] = 20
-                
-            if "cfgScale" not in validated["generateParams"]:
-                validated["generateParams"]["cfgScale"] = 7
-                
-            if "width" not in validated["generateParams"]:
-                validated["generateParams"]["width"] = 768
-                
-            if "height" not in validated["generateParams"]:
-                validated["generateParams"]["height"] = 1024
-                
-            if "imgCount" not in validated["generateParams"]:
-                validated["generateParams"]["imgCount"] = 1
-                
-            if "seed" not in validated["generateParams"]:
-                validated["generateParams"]["seed"] = -1
-                
-            # 设置模板UUID (根据基础算法类型和是文生图还是图生图选择)
-            if "templateUuid" not in validated:
-                # 检查是否指定了基础算法类型
-                base_model_type = validated.get("baseModelType", "").lower()
-                is_f1 = base_model_type == "f.1" or base_model_type == "f1"
-                
-                if "sourceImage" in validated["generateParams"]:
-                    if is_f1:
-                        # F.1图生图模板
-                        validated["templateUuid"] = "63b72710c9574457ba303d9d9b8df8bd"
-                    else:
-                        # 1.5和XL图生图模板
-                        validated["templateUuid"] = "9c7d531dc75f476aa833b3d452b8f7ad"
-                else:
-                    if is_f1:
-                        # F.1文生图模板
-                        validated["templateUuid"] = "6f7c4652458d4802969f8d089cf5b91f"
-                    else:
-                        # 1.5和XL文生图模板
-                        validated["templateUuid"] = "e10adc3949ba59abbe56e057f20f883e"
+        validator = _VALIDATORS.get(model)
+        if validator is not None:
+            validator(validated)
         
         return validated
     
-    async def download_image(self, url: str, save_path: str) -> str:
-        """
-        下载图像并保存到本地
-        
-        Args:
-            url: 图像URL
-            save_path: 保存路径
-            
-        Returns:
-            str: 本地文件路径
-        """
-        try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            
-            # 下载图像
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                # 保存图像
-                with open(save_path, "wb") as f:
-                    f.write(response.content)
-                    
-                logger.info(f"Image downloaded and saved to {save_path}")
-                return save_path
-        except Exception as e:
-            logger.error(f"Error downloading image: {str(e)}")
-            return ""
+    @classmethod
+    def _client_kwargs(cls) -> Dict[str, Any]:
+        """共享HTTP客户端的创建参数"""
+        # 连接数上限较小，并发的任务创建和状态轮询通过HTTP/2在少量连接上多路复用
+        return {
+            "timeout": httpx.Timeout(120.0),
+            "limits": httpx.Limits(max_keepalive_connections=10, max_connections=10),
+            "http2": True,
+        }
     
     async def call_model(self, model: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -255,30 +249,17 @@ class LiblibAIProvider(ModelProvider):
         # 验证参数
         validated_params = await self.validate_parameters(model, parameters)
         
-        # 获取API基础URL
-        api_base_url = settings.LIBLIBAI_API_URL
-        if not api_base_url:
-            api_base_url = "https://openapi.liblibai.cloud"
-        
         # 根据模型类型确定API端点
-        if model == "star-3-alpha-t2i":
-            api_endpoint = "/api/generate/webui/text2img/ultra"
-        elif model == "star-3-alpha-i2i":
-            api_endpoint = "/api/generate/webui/img2img/ultra"
-        elif model == "liblib-custom":
-            if "sourceImage" in validated_params.get("generateParams", {}):
-                api_endpoint = "/api/generate/webui/img2img"
-            else:
-                api_endpoint = "/api/generate/webui/text2img"
+        if model == "liblib-custom":
+            api_endpoint = _CUSTOM_ENDPOINTS["sourceImage" in validated_params.get("generateParams", {})]
         else:
-            raise ValueError(f"Unsupported model: {model}")
+            api_endpoint = _ENDPOINTS.get(model)
+            if api_endpoint is None:
+                raise ValueError(f"Unsupported model: {model}")
         
         # 生成签名参数
         signature_params = self.generate_signature(api_endpoint)
         
-        # 构建完整API URL
-        api_url = f"{api_base_url}{api_endpoint}"
-        
         logger.info(f"Calling LiblibAI image model {model}")
         
         try:
@@ -289,7 +270,7 @@ class LiblibAIProvider(ModelProvider):
             }
             
             # 记录完整的请求参数
-            logger.info(f"Request data for LiblibAI API: {json.dumps(request_data, ensure_ascii=False)}")
+            logger.info("Request data for LiblibAI API: %s", LazyJSON(request_data))
             
             # 准备请求头
             headers = {
@@ -297,85 +278,89 @@ class LiblibAIProvider(ModelProvider):
             }
             
             # 调用API创建任务
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                # 构建带签名的URL
-                url_with_params = f"{api_url}?AccessKey={signature_params['AccessKey']}&Signature={signature_params['Signature']}&Timestamp={signature_params['Timestamp']}&SignatureNonce={signature_params['SignatureNonce']}"
-                
-                response = await client.post(
-                    url_with_params,
-                    json=request_data,
+            client = await self.client()
+            
+            # 签名参数通过查询字符串传递（LiblibAI接口要求），由httpx负责编码
+            response = await client.post(
+                _API_URLS[api_endpoint],
+                params=signature_params,
+                content=orjson.dumps(request_data),
+                headers=headers
+            )
+            
+            # 检查响应状态
+            response.raise_for_status()
+            task_result = orjson.loads(response.content)
+            
+            # 记录完整的响应
+            logger.info("Task creation response: %s", LazyJSON(task_result))
+            
+            # 获取任务ID
+            if task_result.get("code") != 0:
+                error_msg = task_result.get("msg", "Unknown error")
+                raise ValueError(f"LiblibAI API error: {error_msg}")
+            
+            generate_uuid = task_result.get("data", {}).get("generateUuid")
+            if not generate_uuid:
+                logger.error(f"Failed to get generateUuid from response: {task_result}")
+                raise ValueError(f"Failed to get generateUuid from response: {task_result}")
+            
+            logger.info(f"Created LiblibAI task with ID: {generate_uuid}")
+            
+            # 轮询任务结果 - 从较短的间隔开始按指数增长，快速任务可以尽早返回
+            base_delay = 1.5  # 初始等待时间（秒）
+            max_delay = 15  # 最长等待时间（秒）
+            deadline = time.monotonic() + 120 * max_delay  # 总等待时间与原先120次×15秒一致
+            attempt = 0
+            
+            while time.monotonic() < deadline:
+                # 等待一段时间
+                delay = min(max_delay, base_delay * (1.5 ** attempt))
+                attempt += 1
+                logger.debug("Task %s waiting %.1fs before status poll %d", generate_uuid, delay, attempt)
+                await asyncio.sleep(delay)
+                
+                # 生成查询任务的签名
+                # 签名中的SignatureNonce用于防重放，每次请求都必须使用新的随机串，不能跨轮询复用签名；
+                # 单次签名的开销已通过复制预处理密钥的HMAC对象降到最低
+                status_signature_params = self.generate_signature(_STATUS_ENDPOINT)
+                
+                # 查询任务状态
+                status_response = await client.post(
+                    _API_URLS[_STATUS_ENDPOINT],
+                    params=status_signature_params,
+                    content=orjson.dumps({"generateUuid": generate_uuid}),
                     headers=headers
                 )
                 
-                # 检查响应状态
-                response.raise_for_status()
-                task_result = response.json()
+                status_response.raise_for_status()
+                task_status = orjson.loads(status_response.content)
                 
-                # 记录完整的响应
-                logger.info(f"Task creation response: {json.dumps(task_result, ensure_ascii=False)}")
+                # 记录完整的任务状态响应
+                logger.debug("Task %s status response: %s", generate_uuid, _RedactedStatus(task_status))
                 
-                # 获取任务ID
-                if task_result.get("code") != 0:
-                    error_msg = task_result.get("msg", "Unknown error")
+                if task_status.get("code") != 0:
+                    error_msg = task_status.get("msg", "Unknown error")
                     raise ValueError(f"LiblibAI API error: {error_msg}")
                 
-                generate_uuid = task_result.get("data", {}).get("generateUuid")
-                if not generate_uuid:
-                    logger.error(f"Failed to get generateUuid from response: {task_result}")
-                    raise ValueError(f"Failed to get generateUuid from response: {task_result}")
-                
-                logger.info(f"Created LiblibAI task with ID: {generate_uuid}")
-                
-                # 轮询任务结果
-                max_retries = 120  # 最多等待120次 (约12分钟)
-                retry_interval = 15  # 每次等待15秒
+                # 获取任务状态
+                task_data = task_status.get("data", {})
+                generate_status = task_data.get("generateStatus", 0)
                 
-                # 构建查询任务状态的URL
-                status_endpoint = "/api/generate/webui/status"
-                
-                for i in range(max_retries):
-                    # 等待一段时间
-                    await asyncio.sleep(retry_interval)
-                    
-                    # 生成查询任务的签名
-                    status_signature_params = self.generate_signature(status_endpoint)
-                    status_url = f"{api_base_url}{status_endpoint}?AccessKey={status_signature_params['AccessKey']}&Signature={status_signature_params['Signature']}&Timestamp={status_signature_params['Timestamp']}&SignatureNonce={status_signature_params['SignatureNonce']}"
-                    
-                    # 查询任务状态
-                    status_response = await client.post(
-                        status_url,
-                        json={"generateUuid": generate_uuid},
-                        headers=headers
-                    )
-                    
-                    status_response.raise_for_status()
-                    task_status = status_response.json()
-                    
-                    # 记录完整的任务状态响应
-                    logger.info(f"Task {generate_uuid} status response: {json.dumps(task_status, ensure_ascii=False)}")
-                    
-                    if task_status.get("code") != 0:
-                        error_msg = task_status.get("msg", "Unknown error")
-                        raise ValueError(f"LiblibAI API error: {error_msg}")
-                    
-                    # 获取任务状态
-                    task_data = task_status.get("data", {})
-                    generate_status = task_data.get("generateStatus", 0)
-                    
-                    logger.info(f"Task {generate_uuid} status: {generate_status}")
-                    
-                    # 如果任务完成或失败，返回结果
-                    if generate_status == 5:  # 成功
-                        # 格式化响应结果并下载图片
-                        result = await self._format_response_and_download_images(task_data, validated_params)
-                        return result
-                    elif generate_status == 6 or generate_status == 7:  # 失败或超时
-                        error_msg = task_data.get("generateMsg", "Task failed or timed out")
-                        raise ValueError(f"Task failed: {error_msg}")
-                
-                # 超过最大重试次数
-                raise ValueError(f"Task {generate_uuid} did not complete within expected time")
+                logger.debug("Task %s status: %s", generate_uuid, generate_status)
                 
+                # 如果任务完成或失败，返回结果
+                if generate_status == 5:  # 成功
+                    # 格式化响应结果并下载图片
+                    result = await self._format_response_and_download_images(task_data, validated_params)
+                    return result
+                elif generate_status == 6 or generate_status == 7:  # 失败或超时
+                    error_msg = task_data.get("generateMsg", "Task failed or timed out")
+                    raise ValueError(f"Task failed: {error_msg}")
+            
+            # 超过最大重试次数
+            raise ValueError(f"Task {generate_uuid} did not complete within expected time")
+            
         except httpx.HTTPStatusError as e:
             error_detail = {}
             try:
@@ -402,35 +387,39 @@ class LiblibAIProvider(ModelProvider):
         Returns:
             Dict[str, Any]: 格式化的响应，包含本地图片路径
         """
+        # 同一批图片共用一个时间，只获取一次本地时间
+        now = time.localtime()
+        timestamp = time.strftime("%Y%m%d_%H%M%S", now)
+        
         # 构建统一格式的响应
         formatted_response = {
             "id": api_response.get("generateUuid", str(uuid.uuid4())),
             "model": original_params.get("model", ""),
-            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", now),
             "images": [],
             "pointsCost": api_response.get("pointsCost", 0),
             "accountBalance": api_response.get("accountBalance", 0)
         }
         
-        # 设置图片保存目录
-        images_dir = Path(settings.DATA_DIR) / "images" / "liblibai"
-        os.makedirs(images_dir, exist_ok=True)
-        
-        # 下载并保存图片
+        # 生成每张图片的保存路径
         images = api_response.get("images", [])
+        download_tasks = []
         for i, image_data in enumerate(images):
             image_url = image_data.get("imageUrl", "")
             if not image_url:
                 continue
                 
             # 生成唯一文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             file_name = f"liblibai_{timestamp}_{i}_{uuid.uuid4().hex[:8]}.png"
-            local_path = os.path.join(images_dir, file_name)
-            
-            # 下载图片
-            saved_path = await self.download_image(image_url, local_path)
-            
+            local_path = os.path.join(self.images_dir, file_name)
+            download_tasks.append((i, image_data, image_url, local_path))
+        
+        # 并发下载所有图片
+        saved_paths = await self.download_images(
+            [(image_url, local_path) for _, _, image_url, local_path in download_tasks]
+        )
+        
+        for (i, image_data, image_url, _), saved_path in zip(download_tasks, saved_paths):
             # 添加到响应中
             image_info = {
                 "index": i,
@@ -461,8 +450,3 @@ class LiblibAIProvider(ModelProvider):
             formatted_response["height"] = 1024
             
         return formatted_response
-
-
-# 注册提供商
-from . import register_provider
-register_provider(LiblibAIProvider) 
\ No newline at end of file
@@ -6,9 +6,14 @@ from ..core.celery_app import celery_app
 from ..core.logging import logger
 from ..core.config import settings
 from ..models.task import TaskStatus
-from ..services.model_providers import get_provider
+from ..services.model_providers import get_provider, close_provider_clients
 from ..db.mongodb import MONGODB_POOL_SETTINGS
 
+try:
+    import uvloop  # 可选依赖，安装后使用uvloop事件循环
+except ImportError:
+    uvloop = None
+
 
 @celery_app.task(bind=True)
 def process_image_task(self, task_id: str, model: str, provider_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -26,8 +31,8 @@ def process_image_task(self, task_id: str, model: str, provider_name: str, param
     """
     logger.info(f"Processing image task {task_id} with model {model} and provider {provider_name}")
     
-    # 创建异步事件循环
-    loop = asyncio.new_event_loop()
+    # 创建异步事件循环，优先使用uvloop
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     
     # 在任务中创建MongoDB连接，确保使用当前事件循环并配置连接池
@@ -101,6 +106,11 @@ def process_image_task(self, task_id: str, model: str, provider_name: str, param
         
         # 确保关闭事件循环
         if not loop.is_closed():
+            # 关闭绑定在当前事件循环上的HTTP客户端
+            try:
+                loop.run_until_complete(close_provider_clients())
+            except Exception as e:
+                logger.error(f"Error closing provider HTTP clients: {str(e)}")
             loop.close()
 
 